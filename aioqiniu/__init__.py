@@ -1,32 +1,70 @@
 # coding: utf-8
 
-from typing import Union
+import hmac
+import json
+import time
+import asyncio
+from hashlib import sha1
+from collections import Counter
+from contextlib import asynccontextmanager
+from base64 import urlsafe_b64encode
+from typing import Iterable, Union
 from urllib.parse import urlencode
 
-import qiniu
-from aiohttp.client import ClientSession
+from aiohttp.client import DEFAULT_TIMEOUT, ClientSession, ClientTimeout
 
+from aioqiniu.exceptions import QiniuTimeoutError
+from aioqiniu.pipeline import UploadPipeline
 from aioqiniu.services import StorageServiceMixin
+from aioqiniu.timeouts import (DEFAULT_TIMEOUTS, OperationTimeout,
+                               get_remaining_time)
 
 __version__ = "1.3.1"
 
+# 上传策略中允许的字段
+# 详见：https://developer.qiniu.com/kodo/manual/1206/put-policy
+_POLICY_FIELDS = frozenset((
+    "callbackUrl", "callbackBody", "callbackHost", "callbackBodyType",
+    "callbackFetchKey", "returnUrl", "returnBody", "endUser", "saveKey",
+    "forceSaveKey", "insertOnly", "detectMime", "mimeLimit", "fsizeLimit",
+    "fsizeMin", "keylimit", "persistentOps", "persistentNotifyUrl",
+    "persistentPipeline", "persistentType", "persistentWorkflowTemplateID",
+    "deleteAfterDays", "fileType", "isPrefixalScope", "transform",
+    "transformFallbackKey", "transformFallbackMode",
+))
+
 
 class QiniuClient(StorageServiceMixin):
     """七牛云存储异步客户端"""
 
-    def __init__(self, access_key: str, secret_key: str, httpclient: ClientSession = None):
+    def __init__(self, access_key: str, secret_key: str, httpclient: ClientSession = None,
+                 timeouts: dict = None):
         """初始化七牛云异步客户端
 
         :param access_key: 七牛云 AccessKey
         :param secret_key: 七牛云 SecretKey
         :param httpclient: 自定义 `aiohttp.client.ClientSession` 对象，默认为空，自动创建
+        :param timeouts: 各类操作的超时设置，键为"manage"、"upload"或"download"，
+            值为`aioqiniu.timeouts.OperationTimeout`。未指定的操作类型在自动创建
+            `ClientSession`时使用`aioqiniu.timeouts.DEFAULT_TIMEOUTS`，
+            否则沿用`httpclient`的超时设置
         """
+        if not (access_key and secret_key):
+            raise ValueError("invalid key")
         self.__access_key = access_key
         self.__secret_key = secret_key
-        self._auth = qiniu.Auth(access_key, secret_key)
+        # 预先初始化的HMAC-SHA1对象，批量签名时复制使用，避免重复初始化密钥
+        self._hmac = hmac.new(secret_key.encode(), digestmod=sha1)
         if httpclient is None:
             httpclient = ClientSession()
+            default_timeouts = DEFAULT_TIMEOUTS
+        else:
+            default_timeouts = {
+                operation: OperationTimeout() for operation in DEFAULT_TIMEOUTS}
         self.httpclient = httpclient
+        self.timeouts = dict(default_timeouts, **(timeouts or {}))
+        # 各类操作发生超时的次数
+        self.timeout_counts = Counter()
 
     async def __aenter__(self):
         return self
@@ -41,6 +79,51 @@ class QiniuClient(StorageServiceMixin):
     def closed(self) -> bool:
         return self.httpclient.closed
 
+    def _sign(self, data: bytes) -> str:
+        hashed = self._hmac.copy()
+        hashed.update(data)
+        return urlsafe_b64encode(hashed.digest()).decode()
+
+    def _get_timeout(self, operation: str) -> ClientTimeout:
+        base = getattr(self.httpclient, "timeout", DEFAULT_TIMEOUT)
+        config = self.timeouts[operation]
+        total = base.total if config.total is None else config.total
+        remaining = get_remaining_time()
+        if remaining is not None:
+            total = remaining if total is None else min(total, remaining)
+        return ClientTimeout(
+            total=total,
+            connect=base.connect if config.connect is None else config.connect,
+            sock_read=base.sock_read if config.first_byte is None else config.first_byte,
+            sock_connect=base.sock_connect)
+
+    @asynccontextmanager
+    async def _request(self, method: str, operation: str, url: str, **kwargs):
+        """发起请求，超时设置取自操作类型与当前上下文的截止时间
+
+        超时时抛出`aioqiniu.exceptions.QiniuTimeoutError`，并计入`timeout_counts`
+        """
+        try:
+            timeout = self._get_timeout(operation)
+            if timeout.total is not None and timeout.total <= 0:
+                raise asyncio.TimeoutError()
+            async with self.httpclient.request(
+                    method, url, timeout=timeout, **kwargs) as resp:
+                yield resp
+        except asyncio.TimeoutError as e:
+            self.timeout_counts[operation] += 1
+            raise QiniuTimeoutError(operation, url) from e
+
+    def create_upload_pipeline(self, bucket: str, **kwargs) -> UploadPipeline:
+        """创建一个上传到指定空间的批量上传管道
+
+        :param bucket: 上传的目标空间名
+        :param **kwargs: 其他参数，详见`aioqiniu.pipeline.UploadPipeline`
+
+        :return: `aioqiniu.pipeline.UploadPipeline`对象
+        """
+        return UploadPipeline(self, bucket, **kwargs)
+
     def get_token(self, data: str) -> str:
         """从原始数据中生成的token
 
@@ -50,7 +133,9 @@ class QiniuClient(StorageServiceMixin):
 
         :return: 数据签名
         """
-        return self._auth.token(data)
+        if isinstance(data, str):
+            data = data.encode()
+        return "{}:{}".format(self.__access_key, self._sign(data))
 
     def get_token_with_data(self, data: str) -> str:
         """生成带原始数据的token
@@ -61,7 +146,11 @@ class QiniuClient(StorageServiceMixin):
 
         :return: 数据签名，含已编码的原数据
         """
-        return self._auth.token_with_data(data)
+        if isinstance(data, str):
+            data = data.encode()
+        encoded_data = urlsafe_b64encode(data)
+        return "{}:{}:{}".format(
+            self.__access_key, self._sign(encoded_data), encoded_data.decode())
 
     def get_access_token(self, path: str, query: Union[str, dict] = "", body: str = "") -> str:
         """生成七牛云的管理凭证(access token)
@@ -75,10 +164,10 @@ class QiniuClient(StorageServiceMixin):
         详见：https://developer.qiniu.com/kodo/manual/1201/access-token
         """
         if not query:
-            return self._auth.token("{}\n{}".format(path, body))
+            return self.get_token("{}\n{}".format(path, body))
         if isinstance(query, dict):
             query = urlencode(query)
-        return self._auth.token("{}?{}\n{}".format(path, query, body))
+        return self.get_token("{}?{}\n{}".format(path, query, body))
 
     def get_upload_token(self, bucket: str, key: str = None, expires: int = 3600,
                          policy=None, strict_policy: bool = True) -> str:
@@ -93,9 +182,16 @@ class QiniuClient(StorageServiceMixin):
 
         详见：https://developer.qiniu.com/kodo/manual/1208/upload-token
         """
-        return self._auth.upload_token(
-            bucket, key, expires, policy, strict_policy
-        )
+        if not bucket:
+            raise ValueError("invalid bucket name")
+
+        scope = bucket if key is None else "{}:{}".format(bucket, key)
+        args = {"scope": scope, "deadline": int(time.time()) + expires}
+        if policy is not None:
+            for field, value in policy.items():
+                if not strict_policy or field in _POLICY_FIELDS:
+                    args[field] = value
+        return self.get_token_with_data(json.dumps(args, separators=(",", ":")))
 
     def get_private_download_url(self, url: str, expires: int = 3600) -> str:
         """生成私有资源的下载 URL
@@ -107,4 +203,26 @@ class QiniuClient(StorageServiceMixin):
 
         详见：https://developer.qiniu.com/kodo/manual/1202/download-token
         """
-        return self._auth.private_download_url(url, expires)
+        return self.get_private_download_urls((url, ), expires)[0]
+
+    def get_private_download_urls(self, urls: Iterable[str], expires: int = 3600) -> list:
+        """批量生成私有资源的下载 URL
+
+        与`get_private_download_url`结果一致，但所有 URL 共用同一个过期时间点，
+        并复用预先初始化的 HMAC 对象，适合一次生成大量下载 URL 的场景。
+
+        :param urls: 私有资源的 URL 可迭代对象
+        :param expires: 下载 URL 的过期时间，单位为秒，默认为 3600
+
+        :return: 私有资源的下载 URL 列表，顺序与`urls`一致
+
+        详见：https://developer.qiniu.com/kodo/manual/1202/download-token
+        """
+        deadline = "e={}".format(int(time.time()) + expires)
+        token_prefix = "&token={}:".format(self.__access_key)
+        sign = self._sign
+        private_urls = []
+        for url in urls:
+            url = "{}{}{}".format(url, "&" if "?" in url else "?", deadline)
+            private_urls.append(url + token_prefix + sign(url.encode()))
+        return private_urls
@@ -0,0 +1,176 @@
+# coding: utf-8
+
+import os
+import re
+import time
+import asyncio
+from uuid import uuid4
+from hashlib import sha1
+from collections import OrderedDict, namedtuple
+
+# 可以作为磁盘缓存文件名一部分的etag
+_SAFE_ETAG_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+CacheEntry = namedtuple("CacheEntry", ("etag", "data", "validated"))
+CacheEntry.__doc__ = """缓存条目，validated为本进程最近一次确认内容未变化的时间(time.monotonic)，
+从未确认过时为None"""
+
+
+class DownloadCache(object):
+    """下载内容缓存，包含内存和磁盘两级LRU缓存
+
+    条目以(bucket, key)定位，并记录内容的etag。内存层按总字节数淘汰，
+    磁盘层按目录中缓存文件的总大小淘汰，磁盘文件名包含etag，重启后仍可使用。
+    最近`max_age`秒内确认过的条目直接返回，不访问网络，
+    超过`max_age`后由调用方使用etag发起条件请求重新确认。
+    确认时间只在本进程内有效，重启后从磁盘层读取的条目需要重新确认。
+    """
+
+    def __init__(self, memory_limit: int = 64 * 1024 * 1024,
+                 directory: str = None, disk_limit: int = 1024 * 1024 * 1024,
+                 max_age: float = 0):
+        """初始化下载内容缓存
+
+        :param memory_limit: 内存层最大字节数，默认为64MB，设置为0表示不使用内存层
+        :param directory: 磁盘层目录，默认为空，表示不使用磁盘层
+        :param disk_limit: 磁盘层最大字节数，默认为1GB
+        :param max_age: 条目确认后免于重新确认的秒数，默认为0，即每次都重新确认
+        """
+        self.memory_limit = memory_limit
+        self.directory = directory
+        self.disk_limit = disk_limit
+        self.max_age = max_age
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        entries = []
+        for filename in os.listdir(self.directory):
+            name, sep, etag = filename.partition(".")
+            if not sep or etag.endswith(".tmp"):
+                continue
+            stat = os.stat(os.path.join(self.directory, filename))
+            entries.append((stat.st_mtime, name, etag, stat.st_size))
+        for mtime, name, etag, size in sorted(entries):
+            self._disk[name] = (etag, size, None)
+            self._disk_size += size
+        self._evict_disk()
+
+    @staticmethod
+    def _get_name(bucket: str, key: str) -> str:
+        return sha1("{}:{}".format(bucket, key).encode()).hexdigest()
+
+    def _get_path(self, name: str, etag: str) -> str:
+        return os.path.join(self.directory, "{}.{}".format(name, etag))
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """判断条目是否在`max_age`内确认过"""
+        if entry.validated is None:
+            return False
+        return time.monotonic() - entry.validated < self.max_age
+
+    async def get(self, bucket: str, key: str) -> CacheEntry:
+        """获取缓存条目，依次查找内存层和磁盘层
+
+        :return: `CacheEntry`对象，未命中时返回None
+        """
+        entry = self._memory.get((bucket, key))
+        if entry is not None:
+            self._memory.move_to_end((bucket, key))
+            return entry
+        if self.directory is None:
+            return None
+        name = self._get_name(bucket, key)
+        if name not in self._disk:
+            return None
+        etag, size, validated = self._disk[name]
+        loop = asyncio.get_event_loop()
+        try:
+            data = await loop.run_in_executor(
+                None, self._read_file, self._get_path(name, etag))
+        except FileNotFoundError:
+            self._discard_disk(name)
+            return None
+        self._disk.move_to_end(name)
+        entry = CacheEntry(etag, data, validated)
+        self._put_memory(bucket, key, entry)
+        return entry
+
+    async def put(self, bucket: str, key: str, etag: str, data: bytes) -> None:
+        """写入缓存条目，同时写入内存层和磁盘层"""
+        validated = time.monotonic()
+        self._put_memory(bucket, key, CacheEntry(etag, data, validated))
+        if self.directory is None or len(data) > self.disk_limit or \
+                not _SAFE_ETAG_RE.match(etag):
+            return
+        name = self._get_name(bucket, key)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None, self._write_file, self._get_path(name, etag), data)
+        # 写入期间同一条目可能已被并发的put更新，写入完成后再处理旧条目
+        old = self._disk.pop(name, None)
+        if old is not None:
+            self._disk_size -= old[1]
+            if old[0] != etag:
+                self._remove_file(name, old[0])
+        self._disk[name] = (etag, len(data), validated)
+        self._disk_size += len(data)
+        self._evict_disk()
+
+    def touch(self, bucket: str, key: str) -> None:
+        """将条目标记为刚刚确认过，内存层和磁盘层都会记录"""
+        validated = time.monotonic()
+        entry = self._memory.get((bucket, key))
+        if entry is not None:
+            self._memory[(bucket, key)] = entry._replace(validated=validated)
+        if self.directory is not None:
+            name = self._get_name(bucket, key)
+            if name in self._disk:
+                etag, size, _ = self._disk[name]
+                self._disk[name] = (etag, size, validated)
+
+    def _put_memory(self, bucket: str, key: str, entry: CacheEntry) -> None:
+        old = self._memory.pop((bucket, key), None)
+        if old is not None:
+            self._memory_size -= len(old.data)
+        if len(entry.data) > self.memory_limit:
+            return
+        self._memory[(bucket, key)] = entry
+        self._memory_size += len(entry.data)
+        while self._memory_size > self.memory_limit:
+            evicted = self._memory.popitem(last=False)[1]
+            self._memory_size -= len(evicted.data)
+
+    def _discard_disk(self, name: str) -> None:
+        if name not in self._disk:
+            return
+        etag, size, _ = self._disk.pop(name)
+        self._disk_size -= size
+        self._remove_file(name, etag)
+
+    def _remove_file(self, name: str, etag: str) -> None:
+        try:
+            os.remove(self._get_path(name, etag))
+        except FileNotFoundError:
+            pass
+
+    def _evict_disk(self) -> None:
+        while self._disk_size > self.disk_limit:
+            self._discard_disk(next(iter(self._disk)))
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        tmppath = "{}.{}.tmp".format(path, uuid4().hex)
+        with open(tmppath, "wb") as f:
+            f.write(data)
+        os.replace(tmppath, path)
@@ -1,5 +1,7 @@
 # coding: utf-8
 
+import asyncio
+
 
 class QiniuError(Exception):
     """七牛的接口错误异常
@@ -11,7 +13,22 @@ class QiniuError(Exception):
         self.error = error
 
     def __str__(self):
-        return f'QiniuError(code={self.code:r}, error={self.error:r})'
+        return f'QiniuError(code={self.code!r}, error={self.error!r})'
 
     def __repr__(self):
         return self.__str__()
+
+
+class QiniuTimeoutError(asyncio.TimeoutError):
+    """请求七牛接口超时异常
+
+    :param operation: 超时的操作类型，"manage"、"upload"或"download"
+    :param url: 超时的请求 URL
+    """
+    def __init__(self, operation: str, url: str):
+        super().__init__(operation, url)
+        self.operation = operation
+        self.url = url
+
+    def __str__(self):
+        return f'QiniuTimeoutError(operation={self.operation!r}, url={self.url!r})'
@@ -0,0 +1,165 @@
+# coding: utf-8
+
+import time
+import asyncio
+from collections import namedtuple
+
+from aioqiniu.utils import ETAG_BLOCK_SIZE
+
+UploadStats = namedtuple("UploadStats", (
+    "objects", "bytes", "failures", "objects_per_second", "bytes_per_second",
+    "queue_depth", "elapsed"))
+UploadStats.__doc__ = """上传管道的统计信息"""
+
+
+class UploadPipeline(object):
+    """批量上传管道
+
+    使用有界队列接收上传任务，由固定数量的worker并发上传，队列满时`submit`会等待，
+    从而对提交方形成背压。同一空间的上传凭证会被复用，并在过期前自动更新。
+    复用的凭证作用域为整个空间(scope为空间名)，因此无法覆盖空间中已存在的同名文件。
+    不超过`block_threshold`的数据使用表单上传，超过的使用分块上传。
+
+    使用样例：
+
+        async with client.create_upload_pipeline("BUCKET") as pipeline:
+            futures = [await pipeline.submit(data, key) for key, data in items]
+            results = await asyncio.gather(*futures)
+    """
+
+    def __init__(self, client, bucket: str, workers: int = 16,
+                 maxsize: int = 1000, block_threshold: int = ETAG_BLOCK_SIZE,
+                 token_expires: int = 3600, policy: dict = None,
+                 host: str = None):
+        """初始化上传管道
+
+        :param client: `aioqiniu.QiniuClient`对象
+        :param bucket: 上传的目标空间名
+        :param workers: 并发上传的worker数量，默认为16
+        :param maxsize: 待上传队列的最大长度，默认为1000
+        :param block_threshold: 使用分块上传的数据大小阈值，默认为4MB
+        :param token_expires: 上传凭证的过期时间，单位为秒，默认为3600
+        :param policy: 上传策略，默认为空
+        :param host: 上传的服务器地址，默认为"upload.qiniu.com"
+        """
+        self.client = client
+        self.bucket = bucket
+        self.block_threshold = block_threshold
+        self.host = host
+        self._workers = workers
+        self._maxsize = maxsize
+        self._token_expires = token_expires
+        self._policy = policy
+        self._token = None
+        self._token_deadline = 0
+        self._queue = None
+        self._tasks = []
+        self._start_time = None
+        self._objects = 0
+        self._bytes = 0
+        self._failures = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _start(self) -> None:
+        loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue(self._maxsize)
+        self._tasks = [loop.create_task(self._work())
+                       for i in range(self._workers)]
+        self._start_time = time.monotonic()
+
+    def get_token(self) -> str:
+        """获取管道复用的上传凭证，剩余有效期不足一半时重新生成"""
+        now = time.monotonic()
+        if self._token is None or now >= self._token_deadline:
+            self._token = self.client.get_upload_token(
+                self.bucket, expires=self._token_expires, policy=self._policy)
+            self._token_deadline = now + self._token_expires / 2
+        return self._token
+
+    async def submit(self, data: bytes, key: str = None, params: dict = None,
+                     mimetype: str = None) -> asyncio.Future:
+        """提交一个上传任务，队列已满时等待
+
+        :param data: 上传的字节码数据
+        :param key: 上传后的文件命名
+        :param params: 用户自定义参数，可为空，dict类型
+        :param mimetype: 上传数据的mimetype值，默认为空，可由七牛自动探测
+
+        :return: 该上传任务的Future对象，结果为上传后的文件信息
+        """
+        if self._queue is None:
+            self._start()
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((future, data, key, params, mimetype))
+        return future
+
+    async def upload(self, data: bytes, key: str = None, params: dict = None,
+                     mimetype: str = None) -> dict:
+        """提交一个上传任务并等待其完成
+
+        参数同`submit`
+
+        :return: 上传后的文件信息，包含hash和key
+        """
+        return await (await self.submit(data, key, params, mimetype))
+
+    async def _work(self) -> None:
+        while True:
+            future, data, key, params, mimetype = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                try:
+                    size = memoryview(data).nbytes
+                    if size > self.block_threshold:
+                        upload = self.client.upload_data_by_blocks
+                    else:
+                        upload = self.client.upload_data
+                    ret = await upload(data, self.get_token(), key=key,
+                                       params=params, mimetype=mimetype,
+                                       host=self.host)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    self._failures += 1
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    self._objects += 1
+                    self._bytes += size
+                    if not future.cancelled():
+                        future.set_result(ret)
+            finally:
+                self._queue.task_done()
+
+    @property
+    def stats(self) -> UploadStats:
+        """当前的统计信息，包括成功上传的对象数、字节数、失败数、速率以及队列长度"""
+        if self._start_time is None:
+            return UploadStats(0, 0, 0, 0.0, 0.0, 0, 0.0)
+        elapsed = time.monotonic() - self._start_time
+        return UploadStats(
+            self._objects, self._bytes, self._failures,
+            self._objects / elapsed if elapsed else 0.0,
+            self._bytes / elapsed if elapsed else 0.0,
+            self._queue.qsize() if self._queue is not None else 0, elapsed)
+
+    async def join(self) -> None:
+        """等待所有已提交的上传任务完成"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """等待所有已提交的上传任务完成后停止worker"""
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
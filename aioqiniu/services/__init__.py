@@ -1,6 +1,6 @@
 # coding: utf-8
 
-from aioqiniu.services.storage import StorageServiceMixin
+from aioqiniu.services.storage import FileInfo, StorageServiceMixin
 
 # make flake8 happy
-(StorageServiceMixin, )
+(FileInfo, StorageServiceMixin)
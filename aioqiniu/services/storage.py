@@ -1,24 +1,144 @@
 # coding: utf-8
 
 import os
-from io import BytesIO
-from urllib.parse import urlencode
-from base64 import urlsafe_b64encode, b32encode
+import asyncio
+from uuid import uuid4
+from hashlib import sha1
+from collections import namedtuple
+from urllib.parse import quote, urlencode
+from base64 import urlsafe_b64encode
 
-import aiohttp
+from aiohttp.payload import Payload
 
-from aioqiniu.utils import get_encoded_entry_uri, raise_for_error
+from aioqiniu.exceptions import QiniuError
+from aioqiniu.utils import (ETAG_BLOCK_SIZE, _get_etag_from_sha1s,
+                            get_encoded_entry_uri, raise_for_error)
+
+
+FileInfo = namedtuple(
+    "FileInfo", ("key", "fsize", "hash", "putTime", "mimeType", "type"))
+FileInfo.__doc__ = """紧凑的文件信息记录，字段与七牛接口返回的文件信息一致"""
+
+
+def _get_file_info(data: dict, key: str = None) -> FileInfo:
+    return FileInfo(data.get("key", key), data.get("fsize"), data.get("hash"),
+                    data.get("putTime"), data.get("mimeType"),
+                    data.get("type", 0))
+
+
+def _get_base_url(host: str) -> str:
+    if host.startswith("http://") or host.startswith("https://"):
+        return host.rstrip("/")
+    return "http://{}".format(host)
+
+
+def _get_upload_url(host: str = None) -> str:
+    return _get_base_url(host or "http://upload.qiniu.com")
+
+
+def _quote_header_param(value: str) -> str:
+    """转义`Content-Disposition`中的带引号参数值，拒绝会破坏头部的换行符"""
+    value = str(value)
+    if "\r" in value or "\n" in value:
+        raise ValueError("表单参数不能包含换行符: {!r}".format(value))
+    return '"{}"'.format(value.replace("\\", "\\\\").replace('"', '\\"'))
+
+
+class _UploadFormData(Payload):
+    """表单上传使用的multipart/form-data请求体
+
+    表单字段与文件头部预先编码为一整块字节，文件数据以`memoryview`直接写出，不做拷贝。
+    字段名和文件名中的引号与反斜杠会被转义，包含换行符时抛出ValueError。
+    """
+
+    def __init__(self, data, fields: dict, filename: str = None,
+                 mimetype: str = None):
+        boundary = uuid4().hex
+        self._data = memoryview(data).cast("B")
+        filename = filename or boundary[:8]
+        parts = []
+        for name, value in fields.items():
+            parts.append(
+                '--{}\r\nContent-Disposition: form-data; name={}\r\n\r\n'
+                '{}\r\n'.format(boundary, _quote_header_param(name), value))
+        parts.append(
+            '--{}\r\nContent-Disposition: form-data; name="file"; '
+            'filename={}\r\nContent-Transfer-Encoding: binary\r\n'.format(
+                boundary, _quote_header_param(filename)))
+        if mimetype:
+            parts.append("Content-Type: {}\r\n".format(mimetype))
+        parts.append("\r\n")
+        self._head = "".join(parts).encode()
+        self._tail = "\r\n--{}--\r\n".format(boundary).encode()
+        super().__init__(
+            data, content_type="multipart/form-data; boundary={}".format(boundary))
+        self._size = len(self._head) + self._data.nbytes + len(self._tail)
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return b"".join((self._head, self._data, self._tail)).decode(
+            encoding, errors)
+
+    async def write(self, writer) -> None:
+        await writer.write(self._head)
+        await writer.write(self._data)
+        await writer.write(self._tail)
+
+
+def _build_stat_operation(bucket: str, key: str,
+                          encode=get_encoded_entry_uri) -> str:
+    return "/stat/" + encode(bucket, key)
+
+
+def _build_delete_operation(bucket: str, key: str,
+                            encode=get_encoded_entry_uri) -> str:
+    return "/delete/" + encode(bucket, key)
+
+
+def _build_copy_operation(bucket: str, key: str, to_bucket: str,
+                          to_key: str, force: bool = False,
+                          encode=get_encoded_entry_uri) -> str:
+    return "/copy/{}/{}/force/{}".format(
+        encode(bucket, key), encode(to_bucket, to_key),
+        "true" if force else "false")
+
+
+def _build_move_operation(bucket: str, key: str, to_bucket: str,
+                          to_key: str, force: bool = False,
+                          encode=get_encoded_entry_uri) -> str:
+    return "/move/{}/{}/force/{}".format(
+        encode(bucket, key), encode(to_bucket, to_key),
+        "true" if force else "false")
+
+
+def _build_rename_operation(bucket: str, key: str, to_key: str,
+                            force: bool = False,
+                            encode=get_encoded_entry_uri) -> str:
+    return _build_move_operation(bucket, key, bucket, to_key, force, encode)
+
+
+def _get_memoized_encoder():
+    """返回带有独立缓存的EncodedEntryURI编码函数，用于同一批次中重复出现的文件"""
+    entries = {}
+
+    def encode(bucket: str, key: str = None) -> str:
+        entry = entries.get((bucket, key))
+        if entry is None:
+            entry = entries[(bucket, key)] = get_encoded_entry_uri(bucket, key)
+        return entry
+
+    return encode
 
 
 class StorageServiceMixin(object):
     """七牛云对象存储服务Mixin"""
 
-    _opcode2arglen = {
-        "stat": (2, ),
-        "copy": (4, 5),
-        "move": (4, 5),
-        "rename": (3, 4),
-        "delete": (2, ),
+    # 操作码 -> (操作路径构造函数, 合法的参数个数)
+    _opcode2builder = {
+        "stat": (_build_stat_operation, (2, )),
+        "copy": (_build_copy_operation, (4, 5)),
+        "move": (_build_move_operation, (4, 5)),
+        "rename": (_build_rename_operation, (3, 4)),
+        "delete": (_build_delete_operation, (2, )),
     }
 
     async def create_bucket(self, bucket: str, region: str = None, g: bool = False) -> None:
@@ -43,7 +163,7 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def delete_bucket(self, bucket: str) -> None:
@@ -61,7 +181,7 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com/drop/{}".format(bucket)
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def list_buckets(self) -> list:
@@ -75,7 +195,7 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "https://rs.qbox.me/buckets"
 
-        async with self.httpclient.get(url, headers=headers) as resp:
+        async with self._request("GET", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
             bucket_list = await resp.json()
 
@@ -95,7 +215,7 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "https://api.qiniu.com/v6/domain/list?{}".format(querystring)
 
-        async with self.httpclient.get(url, headers=headers) as resp:
+        async with self._request("GET", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
             domain_list = await resp.json()
 
@@ -103,7 +223,7 @@ class StorageServiceMixin(object):
 
     async def list_files(self, bucket: str, limit: int = 1000,
                          prefix: str = None, delimiter: str = None,
-                         marker: str = None) -> dict:
+                         marker: str = None, compact: bool = False) -> dict:
         """列举文件
 
         :param bucket: 待列举文件空间名
@@ -111,6 +231,7 @@ class StorageServiceMixin(object):
         :param prefix: 指定文件的前缀，默认为空
         :param delimiter: 指定目录分隔符，会模拟目录的列出效果，默认为空
         :param marker: 上一次列举返回的标记，作为本次列举的起点，默认为空
+        :param compact: 为True时"items"中的元素为`FileInfo`而非dict，默认为False
 
         :return: 匹配的文件信息
 
@@ -123,10 +244,13 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "https://rsf.qbox.me/list?{}".format(querystring)
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
             files = await resp.json()
 
+        if compact:
+            files["items"] = [_get_file_info(item)
+                              for item in files.get("items", ())]
         return files
 
     async def copy_file(self, bucket: str, key: str, to_bucket: str,
@@ -143,16 +267,12 @@ class StorageServiceMixin(object):
 
         详见：https://developer.qiniu.com/kodo/api/1254/copy
         """
-        src_encoded_entry_uri = get_encoded_entry_uri(bucket, key)
-        dst_encoded_entry_uri = get_encoded_entry_uri(to_bucket, to_key)
-        path = "/copy/{}/{}/force/{}".format(
-            src_encoded_entry_uri, dst_encoded_entry_uri,
-            "true" if force else "false")
+        path = _build_copy_operation(bucket, key, to_bucket, to_key, force)
         access_token = self.get_access_token(path)
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def delete_file(self, bucket: str, key: str) -> None:
@@ -163,13 +283,12 @@ class StorageServiceMixin(object):
 
         详见：https://developer.qiniu.com/kodo/api/1257/delete
         """
-        encoded_entry_uri = get_encoded_entry_uri(bucket, key)
-        path = "/delete/{}".format(encoded_entry_uri)
+        path = _build_delete_operation(bucket, key)
         access_token = self.get_access_token(path)
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def move_file(self, bucket: str, key: str, to_bucket: str,
@@ -184,16 +303,12 @@ class StorageServiceMixin(object):
 
         详见：https://developer.qiniu.com/kodo/api/1288/move
         """
-        src_encoded_entry_uri = get_encoded_entry_uri(bucket, key)
-        dst_encoded_entry_uri = get_encoded_entry_uri(to_bucket, to_key)
-        path = "/move/{}/{}/force/{}".format(
-            src_encoded_entry_uri, dst_encoded_entry_uri,
-            "true" if force else "false")
+        path = _build_move_operation(bucket, key, to_bucket, to_key, force)
         access_token = self.get_access_token(path)
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def rename_file(self, bucket: str, key: str, to_key: str,
@@ -221,13 +336,12 @@ class StorageServiceMixin(object):
 
         详见：https://developer.qiniu.com/kodo/api/1308/stat
         """
-        encoded_entry_uri = get_encoded_entry_uri(bucket, key)
-        path = "/stat/{}".format(encoded_entry_uri)
+        path = _build_stat_operation(bucket, key)
         access_token = self.get_access_token(path)
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com" + path
 
-        async with self.httpclient.get(url, headers=headers) as resp:
+        async with self._request("GET", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
             stat = await resp.json()
 
@@ -249,7 +363,7 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def delete_file_after_days(self, bucket: str, key: str,
@@ -268,7 +382,7 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def upload_data(self, data: bytes, token: str, key: str = None,
@@ -276,7 +390,7 @@ class StorageServiceMixin(object):
                           mimetype: str = None, host: str = None) -> dict:
         """直传文件数据到七牛云
 
-        :param data: 上传的字节码数据
+        :param data: 上传的字节码数据，支持bytes、bytearray、memoryview和mmap等
         :param token: 上传凭证
         :param key: 上传后的文件命名
         :param params: 用户自定义参数，可为空，dict类型
@@ -288,35 +402,163 @@ class StorageServiceMixin(object):
 
         详见：https://developer.qiniu.com/kodo/api/1312/upload
         """
-        filename = filename or b32encode(os.urandom(5)).decode()
         params = params or {}
-        host = host or "http://upload.qiniu.com"
-        if host.startswith("http://") or host.startswith("https://"):
-            url = host
-        else:
-            url = "http://{}".format(host)
-
-        with aiohttp.MultipartWriter("form-data") as mpwriter:
-            mpwriter.append(token, {
-                "Content-Disposition": 'form-data; name="token"',
-            })
-            mpwriter.append(key, {
-                "Content-Disposition": 'form-data; name="key"',
-            })
-            for name, value in params.items():
-                mpwriter.append(value, {
-                    "Content-Disposition": 'form-data; name="{}"'.format(name),
-                })
-            mpheaders = {
-                "Content-Disposition":
-                    'form-data; name="file"; filename="{}"'.format(filename),
-                "Content-Transfer-Encoding": "binary",
-            }
-            if mimetype:
-                mpheaders["Content-Type"] = mimetype
-            mpwriter.append(BytesIO(data), mpheaders)
-
-        async with self.httpclient.post(url, data=mpwriter) as resp:
+        url = _get_upload_url(host)
+
+        fields = {"token": token}
+        if key is not None:
+            fields["key"] = key
+        fields.update(params)
+        formdata = _UploadFormData(data, fields, filename, mimetype)
+
+        async with self._request("POST", "upload", url, data=formdata) as resp:
+            await raise_for_error(resp)
+            ret = await resp.json()
+
+        return ret
+
+    async def upload_data_by_blocks(self, data: bytes, token: str,
+                                    key: str = None, params: dict = None,
+                                    mimetype: str = None,
+                                    host: str = None) -> dict:
+        """分块上传文件数据到七牛云
+
+        数据按4MB分块，逐块上传后再合成文件，适合较大的数据。
+
+        :param data: 上传的字节码数据，支持bytes、bytearray、memoryview和mmap等
+        :param token: 上传凭证
+        :param key: 上传后的文件命名
+        :param params: 用户自定义参数，可为空，dict类型，键需以"x:"开头
+        :param mimetype: 上传数据的mimetype值，默认为空，可由七牛自动探测
+        :param host: 上传的服务器地址，默认为"upload.qiniu.com"
+
+        :return: 上传后的文件信息，包含hash和key
+
+        详见：https://developer.qiniu.com/kodo/api/1286/mkfile
+        """
+        view = memoryview(data).cast("B")
+        ctxs = []
+        for offset in range(0, view.nbytes, ETAG_BLOCK_SIZE):
+            ctxs.append(await self._make_block(
+                view[offset:offset + ETAG_BLOCK_SIZE], token, host))
+        return await self._make_file(
+            view.nbytes, ctxs, token, key, params, mimetype, host)
+
+    async def upload_stream(self, stream, token: str, key: str = None,
+                            params: dict = None, mimetype: str = None,
+                            host: str = None, concurrency: int = 2) -> dict:
+        """分块上传异步迭代器产生的数据到七牛云
+
+        数据长度无需预先知道，每凑满4MB就上传一块，同时最多`concurrency`块在上传中，
+        内存中只保留少量块。任意一块上传失败时立即停止读取数据，并取消其他块的上传。
+        etag在读取数据时同步计算，上传完成后与七牛返回的hash比对。
+
+        :param stream: 异步可迭代对象，元素为bytes
+        :param token: 上传凭证
+        :param key: 上传后的文件命名
+        :param params: 用户自定义参数，可为空，dict类型，键需以"x:"开头
+        :param mimetype: 上传数据的mimetype值，默认为空，可由七牛自动探测
+        :param host: 上传的服务器地址，默认为"upload.qiniu.com"
+        :param concurrency: 同时上传的块数，默认为2
+
+        :return: 上传后的文件信息，包含hash和key
+
+        :raise ValueError: `concurrency`小于1时
+        :raise QiniuError: 七牛返回的hash与本地计算的etag不一致时，code为406
+
+        详见：https://developer.qiniu.com/kodo/api/1286/mkfile
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency必须大于等于1: {}".format(concurrency))
+        buffer = bytearray()
+        sha1s = []
+        tasks = []
+        pending = set()
+        size = 0
+
+        def check_done() -> None:
+            for task in [task for task in pending if task.done()]:
+                pending.discard(task)
+                if task.exception() is not None:
+                    raise task.exception()
+
+        async def put_block(block: bytes) -> None:
+            check_done()
+            if len(pending) >= concurrency:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                check_done()
+            sha1s.append(sha1(block).digest())
+            task = asyncio.ensure_future(self._make_block(block, token, host))
+            tasks.append(task)
+            pending.add(task)
+
+        try:
+            async for chunk in stream:
+                buffer += chunk
+                size += len(chunk)
+                while len(buffer) >= ETAG_BLOCK_SIZE:
+                    with memoryview(buffer) as view:
+                        block = bytes(view[:ETAG_BLOCK_SIZE])
+                    await put_block(block)
+                    del buffer[:ETAG_BLOCK_SIZE]
+            if not size:
+                return await self.upload_data(
+                    b"", token, key, params, mimetype=mimetype, host=host)
+            if buffer:
+                await put_block(bytes(buffer))
+                del buffer[:]
+            ctxs = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        ret = await self._make_file(
+            size, ctxs, token, key, params, mimetype, host)
+        etag = _get_etag_from_sha1s(sha1s)
+        if "hash" in ret and ret["hash"] != etag:
+            raise QiniuError(code=406, error="hash mismatch: {} != {}".format(
+                ret["hash"], etag))
+        return ret
+
+    async def _make_block(self, block, token: str, host: str = None) -> str:
+        """创建块并上传块数据，返回块的ctx
+
+        详见：https://developer.qiniu.com/kodo/api/1286/mkblk
+        """
+        headers = {"Authorization": "UpToken {}".format(token),
+                   "Content-Type": "application/octet-stream"}
+        url = "{}/mkblk/{}".format(_get_upload_url(host), len(block))
+
+        async with self._request("POST", "upload", url, data=block,
+                                 headers=headers) as resp:
+            await raise_for_error(resp)
+            ret = await resp.json()
+
+        return ret["ctx"]
+
+    async def _make_file(self, size: int, ctxs: list, token: str,
+                         key: str = None, params: dict = None,
+                         mimetype: str = None, host: str = None) -> dict:
+        """将已上传的块合成文件
+
+        详见：https://developer.qiniu.com/kodo/api/1287/mkfile
+        """
+        path = "/mkfile/{}".format(size)
+        if key is not None:
+            path += "/key/{}".format(urlsafe_b64encode(key.encode()).decode())
+        if mimetype:
+            path += "/mimeType/{}".format(
+                urlsafe_b64encode(mimetype.encode()).decode())
+        for name, value in (params or {}).items():
+            path += "/{}/{}".format(
+                name, urlsafe_b64encode(str(value).encode()).decode())
+        headers = {"Authorization": "UpToken {}".format(token),
+                   "Content-Type": "text/plain"}
+        url = _get_upload_url(host) + path
+
+        async with self._request("POST", "upload", url, data=",".join(ctxs),
+                                 headers=headers) as resp:
             await raise_for_error(resp)
             ret = await resp.json()
 
@@ -345,6 +587,49 @@ class StorageServiceMixin(object):
             data=data, token=token, key=key, params=params,
             filename=filename, mimetype=mimetype, host=host)
 
+    async def download_file(self, bucket: str, key: str, domain: str,
+                            private: bool = False, expires: int = 3600,
+                            cache=None) -> bytes:
+        """下载文件内容
+
+        指定`cache`时为读穿透缓存：在`cache.max_age`内确认过的条目直接返回，
+        否则携带缓存的etag发起条件请求，内容未变化时使用缓存数据。
+
+        :param bucket: 文件所在空间名，用于定位缓存条目
+        :param key: 文件名
+        :param domain: 空间绑定的下载域名
+        :param private: 是否为私有空间，默认为False
+        :param expires: 私有空间下载 URL 的过期时间，单位为秒，默认为 3600
+        :param cache: `aioqiniu.cache.DownloadCache`对象，默认为空，不使用缓存
+
+        :return: 文件内容
+
+        详见：https://developer.qiniu.com/kodo/manual/1232/download-process
+        """
+        url = "{}/{}".format(_get_base_url(domain), quote(key))
+        if private:
+            url = self.get_private_download_url(url, expires)
+        headers = {}
+        entry = None
+        if cache is not None:
+            entry = await cache.get(bucket, key)
+            if entry is not None:
+                if cache.is_fresh(entry):
+                    return entry.data
+                headers["If-None-Match"] = '"{}"'.format(entry.etag)
+
+        async with self._request("GET", "download", url, headers=headers) as resp:
+            if entry is not None and resp.status == 304:
+                cache.touch(bucket, key)
+                return entry.data
+            await raise_for_error(resp)
+            data = await resp.read()
+            etag = resp.headers.get("ETag", "").strip('"')
+
+        if cache is not None and etag:
+            await cache.put(bucket, key, etag, data)
+        return data
+
     async def prefetch(self, bucket: str, key: str) -> None:
         """镜像回源预取
 
@@ -362,7 +647,7 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "https://iovip.qbox.me" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
 
     async def fetch(self, url: str, bucket: str, key: str = None) -> dict:
@@ -383,13 +668,14 @@ class StorageServiceMixin(object):
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "https://iovip.qbox.me" + path
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
             ret = await resp.json()
 
         return ret
 
-    async def batch(self, *operations) -> list:
+    async def batch(self, *operations, compact: bool = False,
+                    memoize: bool = False) -> list:
         """批量操作
 
         支持的批量操作的操作类型：
@@ -410,35 +696,36 @@ class StorageServiceMixin(object):
             ("delete", "BUCKET", "KEY")
 
         :param *operations: 变长位置参数，元素为操作元组
+        :param compact: 为True时成功的"stat"操作结果中"data"为`FileInfo`，默认为False
+        :param memoize: 为True时同一批次中相同的文件只编码一次，适用于文件大量重复的批次，
+            文件互不相同时反而更慢，默认为False
 
         :return: 包含每个操作的结果的列表
 
         详见：https://developer.qiniu.com/kodo/api/1250/batch
         """
+        encode = _get_memoized_encoder() if memoize else get_encoded_entry_uri
         querystring = "&".join(
-            [self._get_operation_string(op[0], *op[1:]) for op in operations]
+            [self._get_operation_string(*op, encode=encode) for op in operations]
         )
         access_token = self.get_access_token("/batch", querystring)
         headers = {"Authorization": "QBox {}".format(access_token)}
         url = "http://rs.qiniu.com/batch?" + querystring
 
-        async with self.httpclient.post(url, headers=headers) as resp:
+        async with self._request("POST", "manage", url, headers=headers) as resp:
             await raise_for_error(resp)
             ret = await resp.json()
 
+        if compact:
+            for op, result in zip(operations, ret):
+                if op[0] == "stat" and "data" in result and \
+                        "error" not in result["data"]:
+                    result["data"] = _get_file_info(result["data"], op[2])
         return ret
 
-    def _get_operation_string(self, code: str, *args) -> str:
-        assert code in self._opcode2arglen, "非法的操作码: {}".format(code)
-        assert len(args) in self._opcode2arglen[code], "操作参数错误"
-
-        if code in ("stat", "delete"):
-            return "op=/{}/{}".format(code, get_encoded_entry_uri(*args))
-        if code == "rename":
-            code = "move"
-            args = (*args[:2], args[0], *args[2:])
-        if code in ("move", "copy"):
-            src = get_encoded_entry_uri(args[0], args[1])
-            dst = get_encoded_entry_uri(args[2], args[3])
-            force = "true" if len(args) == 5 and args[4] else "false"
-            return "op=/{}/{}/{}/force/{}".format(code, src, dst, force)
+    def _get_operation_string(self, code: str, *args,
+                              encode=get_encoded_entry_uri) -> str:
+        assert code in self._opcode2builder, "非法的操作码: {}".format(code)
+        builder, arglens = self._opcode2builder[code]
+        assert len(args) in arglens, "操作参数错误"
+        return "op=" + builder(*args, encode=encode)
@@ -0,0 +1,273 @@
+# coding: utf-8
+
+import time
+import queue
+import pickle
+import asyncio
+import inspect
+import functools
+import itertools
+import multiprocessing
+from zlib import crc32
+
+from aioqiniu import QiniuClient
+
+
+class SharedRateLimiter(object):
+    """跨进程共享的令牌桶限流器
+
+    所有持有同一个限流器的进程共享每秒`rate`个请求的额度，最多累积`burst`个令牌。
+    """
+
+    def __init__(self, rate: float, burst: int = None, context=None):
+        """初始化限流器
+
+        :param rate: 每秒允许的请求数
+        :param burst: 令牌桶容量，默认与`rate`相同
+        :param context: multiprocessing上下文，默认为空，使用默认上下文
+        """
+        context = context or multiprocessing.get_context()
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._lock = context.Lock()
+        self._tokens = context.Value("d", self.burst, lock=False)
+        self._updated = context.Value("d", time.monotonic(), lock=False)
+
+    def _take(self) -> float:
+        """尝试取一个令牌，成功时返回0，否则返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.burst, self._tokens.value +
+                         (now - self._updated.value) * self.rate)
+            self._updated.value = now
+            if tokens >= 1:
+                self._tokens.value = tokens - 1
+                return 0
+            self._tokens.value = tokens
+            return (1 - tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """等待直到取得一个令牌"""
+        wait = self._take()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_signature(method: str) -> inspect.Signature:
+    return inspect.signature(getattr(QiniuClient, method))
+
+
+def get_default_shard_key(method: str, args: tuple, kwargs: dict) -> str:
+    """默认的分片键：调用的文件名参数`key`
+
+    对于`batch`使用第一个操作元组中的文件名。同一个文件的操作总是落在同一个进程上，
+    没有文件名的调用返回None，由执行器轮流分配到各个进程。
+    """
+    if method == "batch":
+        return str(args[0][2]) if args and len(args[0]) > 2 else None
+    try:
+        arguments = _get_signature(method).bind_partial(
+            None, *args, **kwargs).arguments
+    except (AttributeError, TypeError, ValueError):
+        return None
+    key = arguments.get("key")
+    return None if key is None else str(key)
+
+
+def _dump_result(run_id: int, index: int, ok: bool, value) -> tuple:
+    """预先序列化调用结果，无法序列化时改为返回RuntimeError，避免结果在队列中丢失"""
+    try:
+        return run_id, index, ok, pickle.dumps(value)
+    except Exception as e:
+        error = RuntimeError("无法序列化调用结果 {!r}: {}".format(value, e))
+        return run_id, index, False, pickle.dumps(error)
+
+
+async def _serve_shard(access_key: str, secret_key: str, inqueue, outqueue,
+                       concurrency: int, limiter: SharedRateLimiter) -> None:
+    loop = asyncio.get_event_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(client, run_id, index, job):
+        try:
+            method, args, kwargs = pickle.loads(job)
+            if limiter is not None:
+                await limiter.acquire()
+            ret = getattr(client, method)(*args, **kwargs)
+            if inspect.isawaitable(ret):
+                ret = await ret
+        except Exception as e:
+            outqueue.put(_dump_result(run_id, index, False, e))
+        else:
+            outqueue.put(_dump_result(run_id, index, True, ret))
+        finally:
+            semaphore.release()
+
+    async with QiniuClient(access_key, secret_key) as client:
+        tasks = set()
+        while True:
+            job = await loop.run_in_executor(None, inqueue.get)
+            if job is None:
+                break
+            await semaphore.acquire()
+            task = loop.create_task(call(client, *job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+
+def _run_shard(*args) -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(_serve_shard(*args))
+    finally:
+        loop.close()
+
+
+class ShardedRunner(object):
+    """多进程分片执行`QiniuClient`方法
+
+    启动`processes`个子进程，每个子进程拥有独立的事件循环和`QiniuClient`，
+    有分片键的调用按其哈希值分配到固定的子进程，没有分片键的调用轮流分配，
+    结果按提交顺序返回。
+    签名、etag计算和JSON解析等CPU密集工作因此可以利用多个CPU核。
+
+    使用样例：
+
+        with ShardedRunner("ACCESS_KEY", "SECRET_KEY", processes=4) as runner:
+            results = runner.run(
+                ("delete_file", ("BUCKET", key)) for key in keys)
+    """
+
+    def __init__(self, access_key: str, secret_key: str, processes: int = None,
+                 concurrency: int = 64, rate_limit: float = None,
+                 shard_key=get_default_shard_key, context=None):
+        """初始化分片执行器
+
+        :param access_key: 七牛云 AccessKey
+        :param secret_key: 七牛云 SecretKey
+        :param processes: 子进程数量，默认为CPU核数
+        :param concurrency: 每个子进程的最大并发调用数，默认为64
+        :param rate_limit: 所有子进程共享的每秒调用数上限，默认为空，不限流
+        :param shard_key: 分片键函数，参数为(method, args, kwargs)，返回str或None
+        :param context: multiprocessing上下文，默认为空，使用默认上下文
+        """
+        self._context = context or multiprocessing.get_context()
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self.processes = processes or multiprocessing.cpu_count()
+        self.concurrency = concurrency
+        self.shard_key = shard_key
+        self.limiter = None
+        if rate_limit:
+            self.limiter = SharedRateLimiter(rate_limit, context=self._context)
+        self._inqueues = []
+        self._outqueue = None
+        self._workers = []
+        self._round_robin = itertools.count()
+        self._run_ids = itertools.count()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self) -> None:
+        """启动子进程，重复调用无副作用"""
+        if self._workers:
+            return
+        self._outqueue = self._context.Queue()
+        for i in range(self.processes):
+            inqueue = self._context.Queue()
+            worker = self._context.Process(target=_run_shard, args=(
+                self._access_key, self._secret_key, inqueue, self._outqueue,
+                self.concurrency, self.limiter), daemon=True)
+            worker.start()
+            self._inqueues.append(inqueue)
+            self._workers.append(worker)
+
+    def close(self) -> None:
+        """等待已分配的调用执行完毕后停止所有子进程"""
+        for inqueue in self._inqueues:
+            inqueue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._inqueues = []
+        self._workers = []
+        self._outqueue = None
+
+    def terminate(self) -> None:
+        """立即终止所有子进程，未完成的调用被丢弃"""
+        for worker in self._workers:
+            worker.terminate()
+        for worker in self._workers:
+            worker.join()
+        self._inqueues = []
+        self._workers = []
+        self._outqueue = None
+
+    def _get_shard(self, method: str, args: tuple, kwargs: dict) -> int:
+        key = self.shard_key(method, args, kwargs)
+        if key is None:
+            return next(self._round_robin) % self.processes
+        return crc32(key.encode()) % self.processes
+
+    def run(self, calls, return_exceptions: bool = False) -> list:
+        """执行一批调用并按顺序返回结果
+
+        :param calls: 可迭代对象，元素为`(method, args)`或`(method, args, kwargs)`，
+            method为`QiniuClient`的方法名
+        :param return_exceptions: 为True时失败调用的异常作为结果返回，
+            否则在所有调用完成后抛出第一个失败调用的异常，默认为False
+
+        :return: 包含每个调用的结果的列表
+
+        :raise RuntimeError: 有子进程意外退出时，此时所有子进程都会被终止
+        """
+        self.start()
+        # 先序列化全部调用，任何一个无法序列化时不会有调用被分配出去
+        jobs = []
+        for call in calls:
+            method, args, kwargs = (tuple(call) + ({}, ))[:3]
+            jobs.append((self._get_shard(method, args, kwargs),
+                         pickle.dumps((method, args, kwargs))))
+
+        # 结果带有本次执行的编号，之前中断的执行遗留在队列中的结果会被丢弃
+        run_id = next(self._run_ids)
+        for index, (shard, job) in enumerate(jobs):
+            self._inqueues[shard].put((run_id, index, job))
+
+        results = [None] * len(jobs)
+        error = None
+        received = 0
+        while received < len(jobs):
+            result_run_id, index, ok, value = self._get_result()
+            if result_run_id != run_id:
+                continue
+            received += 1
+            value = pickle.loads(value)
+            results[index] = value
+            if not ok and (error is None or index < error[0]):
+                error = (index, value)
+        if error is not None and not return_exceptions:
+            raise error[1]
+        return results
+
+    def _get_result(self) -> tuple:
+        while True:
+            try:
+                return self._outqueue.get(timeout=1)
+            except queue.Empty:
+                pass
+            dead = [worker for worker in self._workers if not worker.is_alive()]
+            if dead:
+                exitcodes = [worker.exitcode for worker in dead]
+                self.terminate()
+                raise RuntimeError(
+                    "子进程意外退出，退出码: {}".format(exitcodes))
@@ -0,0 +1,125 @@
+# coding: utf-8
+
+import asyncio
+import inspect
+import functools
+import threading
+
+from aiohttp.client import ClientSession
+from aiohttp.connector import TCPConnector
+
+from aioqiniu import QiniuClient
+from aioqiniu.timeouts import DEFAULT_TIMEOUTS
+
+
+class SyncQiniuClient(object):
+    """七牛云存储同步客户端
+
+    在一个专用的后台线程中运行事件循环和`QiniuClient`，所有调用共享同一个连接池。
+    `QiniuClient`的协程方法在该线程中执行，调用方线程阻塞等待结果，
+    普通方法(如签名相关方法)直接在调用方线程执行。可以被多个线程同时使用。
+
+    使用样例：
+
+        with SyncQiniuClient("ACCESS_KEY", "SECRET_KEY") as client:
+            stat = client.get_file_stat("BUCKET", "KEY")
+            stats = client.map("get_file_stat", [("BUCKET", key) for key in keys])
+    """
+
+    def __init__(self, access_key: str, secret_key: str, limit: int = 100,
+                 timeout: float = None):
+        """初始化七牛云同步客户端
+
+        :param access_key: 七牛云 AccessKey
+        :param secret_key: 七牛云 SecretKey
+        :param limit: 连接池的最大连接数，默认为100
+        :param timeout: 每次调用等待结果的最长秒数，默认为空，一直等待
+        """
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="aioqiniu-sync", daemon=True)
+        self._thread.start()
+
+        async def create_client():
+            httpclient = ClientSession(connector=TCPConnector(limit=limit))
+            return QiniuClient(access_key, secret_key, httpclient,
+                               DEFAULT_TIMEOUTS)
+
+        self.client = self.run(create_client())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        attr = getattr(self.client, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def method(*args, **kwargs):
+            return self.run(attr(*args, **kwargs))
+
+        return method
+
+    def run(self, coro):
+        """在后台事件循环中执行协程并等待结果
+
+        :param coro: 协程对象
+
+        :return: 协程的返回值
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self.timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def map(self, method: str, args_list, concurrency: int = 32,
+            return_exceptions: bool = False) -> list:
+        """在后台事件循环中并发执行一批相同方法的调用
+
+        :param method: `QiniuClient`的方法名
+        :param args_list: 可迭代对象，元素为参数元组
+        :param concurrency: 最大并发调用数，默认为32
+        :param return_exceptions: 为True时失败调用的异常作为结果返回，否则抛出，默认为False
+
+        :return: 包含每个调用的结果的列表，顺序与`args_list`一致
+        """
+        func = getattr(self.client, method)
+        args_list = list(args_list)
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def call(args):
+                async with semaphore:
+                    ret = func(*args)
+                    if inspect.isawaitable(ret):
+                        ret = await ret
+                    return ret
+
+            return await asyncio.gather(
+                *[call(args) for args in args_list],
+                return_exceptions=return_exceptions)
+
+        return self.run(run_all())
+
+    @property
+    def closed(self) -> bool:
+        return self._loop.is_closed()
+
+    def close(self) -> None:
+        """关闭`QiniuClient`并停止后台事件循环线程"""
+        if self._loop.is_closed():
+            return
+        self.run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
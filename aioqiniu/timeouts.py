@@ -0,0 +1,61 @@
+# coding: utf-8
+
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+OperationTimeout = namedtuple(
+    "OperationTimeout", ("total", "connect", "first_byte"))
+OperationTimeout.__new__.__defaults__ = (None, None, None)
+OperationTimeout.__doc__ = """一类操作的单次请求超时时间，单位为秒
+
+* total: 单次请求的总时间上限
+* connect: 建立连接(含等待连接池)的时间上限
+* first_byte: 等待响应数据的时间上限，即 aiohttp 的 sock_read
+
+值为空时使用 `aiohttp.client.ClientSession` 的对应设置。
+"""
+
+# 各类操作默认的超时时间，"manage"为资源管理操作，"upload"为上传，"download"为下载
+# 仅在`QiniuClient`自行创建`ClientSession`时使用，传入自定义`ClientSession`时默认沿用其超时设置
+DEFAULT_TIMEOUTS = {
+    "manage": OperationTimeout(total=60, connect=10, first_byte=30),
+    "upload": OperationTimeout(connect=10, first_byte=60),
+    "download": OperationTimeout(connect=10, first_byte=60),
+}
+
+_deadline = ContextVar("aioqiniu_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """为代码块内的所有七牛请求设置一个共同的截止时间
+
+    分块上传等由多次请求组成的操作共享同一个时间预算，嵌套使用时以更早的截止时间为准。
+    截止时间会随上下文传递到代码块内创建的任务中。
+
+    使用样例：
+
+        with aioqiniu.timeouts.deadline(30):
+            await client.upload_stream(stream, token, key)
+
+    :param seconds: 从现在起的秒数
+    """
+    when = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        when = min(when, current)
+    token = _deadline.set(when)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_remaining_time() -> float:
+    """获取当前上下文截止时间的剩余秒数，未设置截止时间时返回None"""
+    when = _deadline.get()
+    if when is None:
+        return None
+    return when - time.monotonic()
@@ -1,14 +1,16 @@
 # coding: utf-8
 
-from io import BytesIO
+from hashlib import sha1
 from base64 import urlsafe_b64encode
 
-import qiniu.utils
 from aiohttp.client import ClientResponse
 from aiohttp.client_exceptions import ContentTypeError
 
 from aioqiniu.exceptions import QiniuError
 
+# 七牛etag算法的分块大小：4MB
+ETAG_BLOCK_SIZE = 4 * 1024 * 1024
+
 
 def get_encoded_entry_uri(bucket: str, key: str = None) -> str:
     """生成七牛云API使用的EncodedEntryURI
@@ -22,6 +24,16 @@ def get_encoded_entry_uri(bucket: str, key: str = None) -> str:
     return urlsafe_b64encode(entry_uri.encode()).decode()
 
 
+def _get_etag_from_sha1s(sha1s: list) -> str:
+    if not sha1s:
+        sha1s = [sha1().digest()]
+    if len(sha1s) == 1:
+        data = b"\x16" + sha1s[0]
+    else:
+        data = b"\x96" + sha1(b"".join(sha1s)).digest()
+    return urlsafe_b64encode(data).decode()
+
+
 def get_stream_etag(stream) -> str:
     """计算流数据的七牛etag
 
@@ -29,7 +41,14 @@ def get_stream_etag(stream) -> str:
 
     etag算法详见：https://developer.qiniu.com/kodo/manual/1231/appendix#3
     """
-    return qiniu.utils.etag_stream(stream)
+    stream.seek(0)
+    sha1s = []
+    block = stream.read(ETAG_BLOCK_SIZE)
+    while block:
+        sha1s.append(sha1(block).digest())
+        block = stream.read(ETAG_BLOCK_SIZE)
+    stream.seek(0)
+    return _get_etag_from_sha1s(sha1s)
 
 
 def get_bytes_etag(data: bytes) -> str:
@@ -39,7 +58,10 @@ def get_bytes_etag(data: bytes) -> str:
 
     etag算法详见：https://developer.qiniu.com/kodo/manual/1231/appendix#3
     """
-    return get_stream_etag(BytesIO(data))
+    view = memoryview(data)
+    sha1s = [sha1(view[i:i + ETAG_BLOCK_SIZE]).digest()
+             for i in range(0, len(view), ETAG_BLOCK_SIZE)]
+    return _get_etag_from_sha1s(sha1s)
 
 
 def get_file_etag(filepath: str) -> str:
@@ -49,7 +71,8 @@ def get_file_etag(filepath: str) -> str:
 
     etag算法详见：https://developer.qiniu.com/kodo/manual/1231/appendix#3
     """
-    return qiniu.utils.etag(filepath)
+    with open(filepath, "rb") as f:
+        return get_stream_etag(f)
 
 
 async def raise_for_error(response: ClientResponse):
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""对比批量操作字符串的序列化耗时
+
+`legacy_operation_string`为改用按操作码预编译的构造函数之前的实现，作为对照。
+分别测试所有操作的文件名互不相同，以及文件名在少量热点文件中重复出现两种情况。
+与`batch`一致，操作按每批1000个序列化，`memoized`对应`batch(..., memoize=True)`，
+每批使用独立的EncodedEntryURI缓存。
+
+运行：python benchmarks/bench_batch_operations.py [操作数量] [热点文件数量] [--profile]
+"""
+
+import sys
+import time
+import cProfile
+import pstats
+from base64 import urlsafe_b64encode
+
+from aioqiniu.services import StorageServiceMixin
+from aioqiniu.services.storage import _get_memoized_encoder
+
+# 七牛批量操作接口单次最多支持的操作数
+BATCH_SIZE = 1000
+
+_opcode2arglen = {
+    "stat": (2, ),
+    "copy": (4, 5),
+    "move": (4, 5),
+    "rename": (3, 4),
+    "delete": (2, ),
+}
+
+
+def legacy_encoded_entry_uri(bucket: str, key: str = None) -> str:
+    entry_uri = "{}:{}".format(bucket, key) if key else bucket
+    return urlsafe_b64encode(entry_uri.encode()).decode()
+
+
+def legacy_operation_string(code: str, *args) -> str:
+    assert code in _opcode2arglen, "非法的操作码: {}".format(code)
+    assert len(args) in _opcode2arglen[code], "操作参数错误"
+
+    if code in ("stat", "delete"):
+        return "op=/{}/{}".format(code, legacy_encoded_entry_uri(*args))
+    if code == "rename":
+        code = "move"
+        args = (*args[:2], args[0], *args[2:])
+    if code in ("move", "copy"):
+        src = legacy_encoded_entry_uri(args[0], args[1])
+        dst = legacy_encoded_entry_uri(args[2], args[3])
+        force = "true" if len(args) == 5 and args[4] else "false"
+        return "op=/{}/{}/{}/force/{}".format(code, src, dst, force)
+
+
+def get_operations(count: int, keys: int) -> list:
+    operations = []
+    for i in range(count):
+        key = "img/{}.jpg".format(i % keys)
+        if i % 3 == 2:
+            operations.append(("copy", "bucket", key, "backup", key, True))
+        else:
+            operations.append(("delete", "bucket", key))
+    return operations
+
+
+def run_case(name: str, operations: list) -> None:
+    mixin = StorageServiceMixin()
+    batches = [operations[i:i + BATCH_SIZE]
+               for i in range(0, len(operations), BATCH_SIZE)]
+
+    def legacy():
+        return ["&".join([legacy_operation_string(op[0], *op[1:])
+                          for op in batch]) for batch in batches]
+
+    def current():
+        return ["&".join([mixin._get_operation_string(*op) for op in batch])
+                for batch in batches]
+
+    def memoized():
+        querystrings = []
+        for batch in batches:
+            encode = _get_memoized_encoder()
+            querystrings.append("&".join(
+                [mixin._get_operation_string(*op, encode=encode)
+                 for op in batch]))
+        return querystrings
+
+    assert legacy() == current() == memoized()
+    print(name)
+    for func in (legacy, current, memoized):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print("  {:8}: {:.3f}s, {:.2f}us/op".format(
+            func.__name__, elapsed, elapsed / len(operations) * 1e6))
+
+    if "--profile" in sys.argv:
+        for func in (legacy, current, memoized):
+            profiler = cProfile.Profile()
+            profiler.runcall(func)
+            pstats.Stats(profiler).sort_stats("tottime").print_stats(5)
+
+
+def main(count: int = 300000, keys: int = 200) -> None:
+    run_case("distinct keys", get_operations(count, count))
+    run_case("{} hot keys".format(keys), get_operations(count, keys))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:] if not arg.startswith("--")])
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""对比逐个生成与批量生成私有资源下载 URL 的吞吐量
+
+运行：python benchmarks/bench_private_download_urls.py [URL数量]
+"""
+
+import sys
+import time
+
+import aioqiniu
+
+
+def main(count: int = 100000) -> None:
+    client = aioqiniu.QiniuClient("A" * 40, "S" * 40, httpclient=object())
+    urls = ["http://cdn.example.com/img/{}.jpg".format(i) for i in range(count)]
+
+    start = time.perf_counter()
+    for url in urls:
+        client.get_private_download_url(url)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.get_private_download_urls(urls)
+    bulk = time.perf_counter() - start
+
+    print("get_private_download_url:  {:.3f}s, {:.0f} urls/s".format(
+        single, count / single))
+    print("get_private_download_urls: {:.3f}s, {:.0f} urls/s".format(
+        bulk, count / bulk))
+    print("speedup: {:.2f}x".format(single / bulk))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -12,16 +12,14 @@ setup(
     url="https://github.com/JZQT/aioqiniu",
     description="Asynchronous Qiniu Cloud Storage client based on asyncio",
     install_requires=[
-        'qiniu',
         'aiohttp>=3.4.0',
     ],
     packages=['aioqiniu', 'aioqiniu.services'],
+    python_requires='>=3.7',
     license="MIT",
     keywords="qiniu asyncio",
     classifiers=[
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
     ],
 )
@@ -2,12 +2,21 @@
 
 import os
 import asyncio
+from contextlib import asynccontextmanager
 
 import qiniu
 import pytest
+import aiohttp
+from aiohttp import web
+
+import aioqiniu
+from aioqiniu.exceptions import QiniuError
+from aioqiniu.services.storage import (FileInfo, _UploadFormData,
+                                       _get_memoized_encoder)
 
 from ..tools import (qiniu_environ_is_set_correctly, require_qiniu_environ,
-                     get_qiniu_client, get_qiniu_environ)
+                     get_qiniu_client, get_qiniu_environ, DUMMY_ACCESS_KEY,
+                     DUMMY_SECRET_KEY, start_test_server)
 
 TEST_BUCKET = 'aioqiniu_test_bucket'
 
@@ -51,6 +60,21 @@ class TestStorageServiceMixin(object):
         # 防止上传过快导致无法在bucket里查询出该上传文件的信息
         await asyncio.sleep(5)
 
+    @require_qiniu_environ
+    @pytest.mark.asyncio
+    async def test_upload_stream(self):
+        token = self.qiniu.upload_token(TEST_BUCKET)
+        data = os.urandom(9 * 1024 * 1024)
+
+        async def stream():
+            for i in range(0, len(data), 1000 * 1000):
+                yield data[i:i + 1000 * 1000]
+
+        filedata = await self.qiniu_client.upload_stream(
+            stream(), token, "upload_stream")
+        assert filedata["hash"] == aioqiniu.utils.get_bytes_etag(data)
+        await self.qiniu_client.delete_file(TEST_BUCKET, "upload_stream")
+
     @require_qiniu_environ
     @pytest.mark.asyncio
     async def test_list_files(self):
@@ -58,6 +82,16 @@ class TestStorageServiceMixin(object):
         keys = {filedata["key"] for filedata in data["items"]}
         assert os.path.basename(__file__) in keys
 
+    @require_qiniu_environ
+    @pytest.mark.asyncio
+    async def test_list_files_compact(self):
+        data = await self.qiniu_client.list_files(TEST_BUCKET, compact=True)
+        items = {item.key: item for item in data["items"]}
+        item = items[os.path.basename(__file__)]
+        assert isinstance(item, aioqiniu.services.FileInfo)
+        assert item.hash == qiniu.etag(__file__)
+        assert item.mimeType == "text/plain"
+
     @require_qiniu_environ
     @pytest.mark.asyncio
     async def test_get_file_stat(self):
@@ -85,3 +119,184 @@ class TestStorageServiceMixin(object):
     async def test_delete_bucket(self):
         ret = await self.qiniu_client.delete_bucket(TEST_BUCKET)
         assert ret is None
+
+
+def test_get_operation_string():
+    mixin = aioqiniu.services.StorageServiceMixin()
+    src, dst = qiniu.entry("bucket", "key"), qiniu.entry("to_bucket", "to_key")
+    renamed = qiniu.entry("bucket", "to_key")
+    cases = [
+        (("stat", "bucket", "key"), "op=/stat/{}".format(src)),
+        (("delete", "bucket", "key"), "op=/delete/{}".format(src)),
+        (("copy", "bucket", "key", "to_bucket", "to_key"),
+         "op=/copy/{}/{}/force/false".format(src, dst)),
+        (("move", "bucket", "key", "to_bucket", "to_key", True),
+         "op=/move/{}/{}/force/true".format(src, dst)),
+        (("rename", "bucket", "key", "to_key"),
+         "op=/move/{}/{}/force/false".format(src, renamed)),
+    ]
+    encode = _get_memoized_encoder()
+    for operation, answer in cases:
+        assert mixin._get_operation_string(*operation) == answer
+        assert mixin._get_operation_string(*operation, encode=encode) == answer
+
+    with pytest.raises(AssertionError):
+        mixin._get_operation_string("chgm", "bucket", "key")
+    with pytest.raises(AssertionError):
+        mixin._get_operation_string("stat", "bucket")
+
+
+def test_upload_form_data():
+    data = bytearray(os.urandom(1024))
+    formdata = _UploadFormData(
+        data, {"token": "TOKEN", "key": "KEY"}, "a.txt", "text/plain")
+    boundary = formdata.content_type.split("boundary=")[1]
+    body = b"".join((formdata._head, formdata._data, formdata._tail))
+    assert formdata.size == len(body)
+    assert body.startswith("--{}\r\n".format(boundary).encode())
+    assert body.endswith("\r\n--{}--\r\n".format(boundary).encode())
+    assert b'name="token"\r\n\r\nTOKEN\r\n' in body
+    assert b'name="key"\r\n\r\nKEY\r\n' in body
+    assert b'filename="a.txt"' in body and b"Content-Type: text/plain" in body
+    assert bytes(data) in body
+
+
+@pytest.mark.asyncio
+async def test_upload_form_data_parsed_by_multipart_reader():
+    posts = []
+
+    async def handler(request):
+        post = await request.post()
+        file = post["file"]
+        posts.append((dict(post), file.filename, file.content_type,
+                      file.file.read()))
+        return web.Response()
+
+    data = os.urandom(1024)
+    fields = {"token": "TOKEN", 'x:a"b\\c': "value\r\nwith newline"}
+    filename = 'x\\y "z".txt'
+    runner, host = await start_test_server([web.post("/", handler)])
+    try:
+        async with aiohttp.ClientSession() as session:
+            formdata = _UploadFormData(data, fields, filename, "text/plain")
+            async with session.post("http://{}/".format(host),
+                                    data=formdata) as resp:
+                assert resp.status == 200
+    finally:
+        await runner.cleanup()
+
+    post, posted_filename, content_type, posted_data = posts[0]
+    assert post["token"] == "TOKEN"
+    assert post['x:a"b\\c'] == "value\r\nwith newline"
+    assert posted_filename == filename
+    assert content_type == "text/plain"
+    assert posted_data == data
+
+    for name, filename in (("key\r\nX-Injected: 1", "a.txt"),
+                           ("key", "a\nb.txt")):
+        with pytest.raises(ValueError):
+            _UploadFormData(data, {name: "value"}, filename)
+
+
+class CannedResponse(object):
+
+    status = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    async def json(self):
+        return self.data
+
+
+class CannedQiniuClient(aioqiniu.QiniuClient):
+    """对所有请求返回预设JSON数据的`QiniuClient`"""
+
+    def __init__(self, data):
+        super().__init__(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY,
+                         httpclient=object())
+        self.data = data
+
+    @asynccontextmanager
+    async def _request(self, method, operation, url, **kwargs):
+        yield CannedResponse(self.data)
+
+
+@pytest.mark.asyncio
+async def test_list_files_compact_offline():
+    item = {"key": "a.txt", "fsize": 3, "hash": "Fh", "putTime": 1,
+            "mimeType": "text/plain"}
+    client = CannedQiniuClient({"marker": "m", "items": [item]})
+    files = await client.list_files("bucket", compact=True)
+    assert files["marker"] == "m"
+    assert files["items"] == [FileInfo("a.txt", 3, "Fh", 1, "text/plain", 0)]
+
+    client = CannedQiniuClient({"marker": "m", "items": [dict(item)]})
+    files = await client.list_files("bucket")
+    assert files["items"] == [item]
+
+
+@pytest.mark.asyncio
+async def test_batch_compact_offline():
+    stat = {"fsize": 3, "hash": "Fh", "putTime": 1, "mimeType": "text/plain",
+            "type": 1}
+    results = [
+        {"code": 200, "data": dict(stat)},
+        {"code": 612, "data": {"error": "no such file or directory"}},
+        {"code": 200},
+    ]
+    client = CannedQiniuClient(results)
+    ret = await client.batch(("stat", "bucket", "a.txt"),
+                             ("stat", "bucket", "missing"),
+                             ("delete", "bucket", "b.txt"), compact=True)
+    assert ret[0] == {
+        "code": 200, "data": FileInfo("a.txt", 3, "Fh", 1, "text/plain", 1)}
+    assert ret[1] == {"code": 612, "data": {"error": "no such file or directory"}}
+    assert ret[2] == {"code": 200}
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_aborts_on_failed_block():
+    blocks = []
+
+    async def make_block(request):
+        blocks.append(len(await request.read()))
+        if len(blocks) == 1:
+            return web.json_response(
+                {"code": 500, "error": "mkblk failed"}, status=500)
+        await asyncio.sleep(0.05)
+        return web.json_response({"ctx": "ctx"})
+
+    runner, host = await start_test_server(
+        [web.post("/mkblk/{size}", make_block)],
+        client_max_size=8 * 1024 * 1024)
+
+    chunks = []
+
+    async def stream():
+        for i in range(40):
+            chunks.append(i)
+            yield b"x" * (1024 * 1024)
+
+    try:
+        async with aioqiniu.QiniuClient(DUMMY_ACCESS_KEY,
+                                        DUMMY_SECRET_KEY) as client:
+            with pytest.raises(QiniuError) as excinfo:
+                await client.upload_stream(stream(), "token", host=host)
+    finally:
+        await runner.cleanup()
+
+    assert excinfo.value.code == 500
+    assert len(blocks) <= 3
+    assert len(chunks) < 40
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_invalid_concurrency():
+    async def stream():
+        yield b"data"
+
+    client = aioqiniu.QiniuClient(
+        DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, httpclient=object())
+    with pytest.raises(ValueError):
+        await client.upload_stream(stream(), "token", concurrency=0)
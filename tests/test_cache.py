@@ -0,0 +1,114 @@
+# coding: utf-8
+
+import os
+import asyncio
+
+import pytest
+from aiohttp import web
+
+import aioqiniu
+from aioqiniu.cache import DownloadCache
+
+from .tools import DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, start_test_server
+
+
+@pytest.mark.asyncio
+async def test_memory_cache():
+    cache = DownloadCache(memory_limit=10, max_age=60)
+    await cache.put("bucket", "a", "etag-a", b"aaaa")
+    await cache.put("bucket", "b", "etag-b", b"bbbb")
+    assert (await cache.get("bucket", "a")).data == b"aaaa"
+    await cache.put("bucket", "c", "etag-c", b"cccc")     # 淘汰最久未使用的b
+    assert await cache.get("bucket", "b") is None
+    entry = await cache.get("bucket", "a")
+    assert entry.etag == "etag-a" and cache.is_fresh(entry)
+    await cache.put("bucket", "big", "etag-big", b"x" * 11)
+    assert await cache.get("bucket", "big") is None
+
+
+@pytest.mark.asyncio
+async def test_disk_cache(tmpdir):
+    directory = str(tmpdir)
+    cache = DownloadCache(memory_limit=0, directory=directory, disk_limit=10)
+    await cache.put("bucket", "a", "etagA", b"aaaa")
+    await cache.put("bucket", "b", "etagB", b"bbbb")
+    assert (await cache.get("bucket", "a")).data == b"aaaa"
+    await cache.put("bucket", "c", "etagC", b"cccc")      # 淘汰最久未使用的b
+    assert await cache.get("bucket", "b") is None
+    assert len(os.listdir(directory)) == 2
+
+    await cache.put("bucket", "a", "etagA2", b"AAAA")     # 覆盖旧的etag
+    assert len(os.listdir(directory)) == 2
+
+    cache = DownloadCache(memory_limit=0, directory=directory, disk_limit=10)
+    entry = await cache.get("bucket", "a")
+    assert entry.etag == "etagA2" and entry.data == b"AAAA"
+    assert not cache.is_fresh(entry)
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_validation(tmpdir):
+    directory = str(tmpdir)
+    cache = DownloadCache(memory_limit=0, directory=directory, max_age=3600)
+    await cache.put("bucket", "a", "etagA", b"aaaa")
+    assert cache.is_fresh(await cache.get("bucket", "a"))
+
+    # 重启后从磁盘读取的条目从未在本进程中确认过，无论max_age多大都需要重新确认
+    cache = DownloadCache(memory_limit=0, directory=directory,
+                          max_age=float("inf"))
+    entry = await cache.get("bucket", "a")
+    assert entry.validated is None and not cache.is_fresh(entry)
+    cache.touch("bucket", "a")
+    assert cache.is_fresh(await cache.get("bucket", "a"))
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_concurrent_put(tmpdir):
+    directory = str(tmpdir)
+    cache = DownloadCache(memory_limit=0, directory=directory)
+    await asyncio.gather(cache.put("bucket", "a", "e1", b"1" * 100),
+                         cache.put("bucket", "a", "e2", b"2" * 100))
+    assert cache._disk_size == 100
+    assert len(os.listdir(directory)) == 1
+    await asyncio.gather(cache.put("bucket", "a", "e3", b"3" * 100),
+                         cache.put("bucket", "a", "e3", b"3" * 100))
+    assert cache._disk_size == 100
+    assert os.listdir(directory) == [os.path.basename(
+        cache._get_path(cache._get_name("bucket", "a"), "e3"))]
+
+
+@pytest.mark.asyncio
+async def test_download_file_with_cache():
+    requests = []
+    content = {"data": b"one"}
+
+    async def handler(request):
+        requests.append(request.headers.get("If-None-Match"))
+        etag = '"E{}"'.format(content["data"].decode())
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=content["data"], headers={"ETag": etag})
+
+    runner, domain = await start_test_server([web.get("/{key}", handler)])
+    try:
+        cache = DownloadCache()
+        async with aioqiniu.QiniuClient(DUMMY_ACCESS_KEY,
+                                        DUMMY_SECRET_KEY) as client:
+            data = await client.download_file("b", "k", domain, cache=cache)
+            assert data == b"one"
+            data = await client.download_file("b", "k", domain, cache=cache)
+            assert data == b"one"
+            assert requests == [None, '"Eone"']
+
+            content["data"] = b"two"
+            data = await client.download_file("b", "k", domain, cache=cache)
+            assert data == b"two"
+            assert requests[-1] == '"Eone"'
+            assert (await cache.get("b", "k")).etag == "Etwo"
+
+            cache.max_age = 60
+            data = await client.download_file("b", "k", domain, cache=cache)
+            assert data == b"two"
+            assert len(requests) == 3
+    finally:
+        await runner.cleanup()
@@ -1,12 +1,17 @@
 # coding: utf-8
 
+import time
 import asyncio
 from random import random, randint
 
 import qiniu
+import pytest
+
+import aioqiniu
 
 from .tools import (qiniu_environ_is_set_correctly, require_qiniu_environ,
-                    get_qiniu_client, get_qiniu_environ)
+                    get_qiniu_client, get_qiniu_environ, DUMMY_ACCESS_KEY,
+                    DUMMY_SECRET_KEY)
 
 
 class TestQiniuClient(object):
@@ -45,4 +50,61 @@ class TestQiniuClient(object):
             answer = self.qiniu_auth.private_download_url(*args)
             assert self.qiniu_client.get_private_download_url(*args) == answer
 
+    @require_qiniu_environ
+    def test_get_private_download_urls(self):
+        urls = [str(random()) for i in range(10)]
+        urls += ["{}?imageView2/1/w/100".format(url) for url in urls]
+        answer = [self.qiniu_auth.private_download_url(url, 60) for url in urls]
+        assert self.qiniu_client.get_private_download_urls(urls, 60) == answer
+
     pass
+
+
+def get_dummy_clients(monkeypatch) -> tuple:
+    """返回使用相同测试密钥的(aioqiniu.QiniuClient, qiniu.Auth)，并固定当前时间"""
+    monkeypatch.setattr(time, "time", lambda: 1500000000.5)
+    client = aioqiniu.QiniuClient(
+        DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, httpclient=object())
+    return client, qiniu.Auth(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY)
+
+
+def test_get_private_download_urls(monkeypatch):
+    client, auth = get_dummy_clients(monkeypatch)
+    urls = [str(random()) for i in range(10)]
+    urls += ["{}?imageView2/1/w/100".format(url) for url in urls]
+    answer = [auth.private_download_url(url, 60) for url in urls]
+    assert client.get_private_download_urls(urls, 60) == answer
+    assert client.get_private_download_url(urls[0], 60) == answer[0]
+
+
+def test_get_token(monkeypatch):
+    client, auth = get_dummy_clients(monkeypatch)
+    for data in ("", "data", "数据", str(random())):
+        assert client.get_token(data) == auth.token(data)
+        assert client.get_token_with_data(data) == auth.token_with_data(data)
+
+
+def test_get_access_token(monkeypatch):
+    client, auth = get_dummy_clients(monkeypatch)
+    assert client.get_access_token("/buckets") == auth.token("/buckets\n")
+    assert client.get_access_token("/list", {"bucket": "b", "limit": 1}) == \
+        auth.token("/list?bucket=b&limit=1\n")
+    assert client.get_access_token("/batch", "op=/stat/x", "body") == \
+        auth.token("/batch?op=/stat/x\nbody")
+
+
+def test_get_upload_token(monkeypatch):
+    client, auth = get_dummy_clients(monkeypatch)
+    policy = {"returnBody": '{"key":"$(key)"}', "deleteAfterDays": 1,
+              "notAPolicyField": "value"}
+    args_list = [
+        ("bucket", ), ("bucket", "key"), ("bucket", "key", 1),
+        ("bucket", None, 3600, policy),
+        ("bucket", "key", 3600, policy, True),
+        ("bucket", "key", 3600, policy, False),
+    ]
+    for args in args_list:
+        assert client.get_upload_token(*args) == auth.upload_token(*args)
+
+    with pytest.raises(ValueError):
+        client.get_upload_token("")
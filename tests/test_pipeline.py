@@ -0,0 +1,72 @@
+# coding: utf-8
+
+import asyncio
+
+import pytest
+
+from aioqiniu.pipeline import UploadPipeline
+
+
+class FakeQiniuClient(object):
+    """只记录上传调用的`QiniuClient`替身，用于测试上传管道的调度逻辑"""
+
+    def __init__(self):
+        self.tokens = 0
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    def get_upload_token(self, bucket, key=None, expires=3600, policy=None):
+        self.tokens += 1
+        return "token-{}".format(self.tokens)
+
+    async def _upload(self, method, data, token, key=None, **kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.001)
+        self.running -= 1
+        if key == "bad":
+            raise ValueError(key)
+        self.calls.append((method, key, token))
+        return {"key": key}
+
+    async def upload_data(self, *args, **kwargs):
+        return await self._upload("form", *args, **kwargs)
+
+    async def upload_data_by_blocks(self, *args, **kwargs):
+        return await self._upload("blocks", *args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_upload_pipeline():
+    client = FakeQiniuClient()
+    async with UploadPipeline(client, "bucket", workers=4, maxsize=2,
+                              block_threshold=10) as pipeline:
+        futures = [await pipeline.submit(b"x" * i, str(i)) for i in range(20)]
+        assert pipeline.stats.queue_depth <= 2
+        assert await pipeline.upload(b"small", "one") == {"key": "one"}
+        with pytest.raises(ValueError):
+            await pipeline.upload(b"x", "bad")
+        results = await asyncio.gather(*futures)
+
+    assert [ret["key"] for ret in results] == [str(i) for i in range(20)]
+    assert client.max_running == 4
+    assert client.tokens == 1
+    methods = {key: method for method, key, token in client.calls}
+    assert methods["10"] == "form" and methods["11"] == "blocks"
+    stats = pipeline.stats
+    assert stats.objects == 21 and stats.failures == 1
+    assert stats.bytes == sum(range(20)) + len(b"small")
+
+
+@pytest.mark.asyncio
+async def test_upload_pipeline_invalid_data():
+    client = FakeQiniuClient()
+    async with UploadPipeline(client, "bucket", workers=1) as pipeline:
+        future = await pipeline.submit("not bytes", "str")
+        with pytest.raises(TypeError):
+            await asyncio.wait_for(future, 1)
+        assert await asyncio.wait_for(pipeline.upload(b"x", "ok"), 1) == \
+            {"key": "ok"}
+        await asyncio.wait_for(pipeline.join(), 1)
+    assert pipeline.stats.failures == 1
@@ -0,0 +1,114 @@
+# coding: utf-8
+
+import os
+import time
+import pickle
+import asyncio
+import multiprocessing
+
+import pytest
+
+import aioqiniu
+from aioqiniu import sharding
+from aioqiniu.sharding import (ShardedRunner, SharedRateLimiter,
+                               get_default_shard_key)
+
+from .tools import DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY
+
+
+def test_sharded_runner():
+    client = aioqiniu.QiniuClient(
+        DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, httpclient=object())
+    calls = [("get_token", (str(i), )) for i in range(200)]
+    calls.append(("get_token_with_data", (), {"data": "data"}))
+
+    with ShardedRunner(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY,
+                       processes=2) as runner:
+        results = runner.run(calls)
+        assert results[:200] == [client.get_token(str(i)) for i in range(200)]
+        assert results[200] == client.get_token_with_data("data")
+
+        calls = [("get_token", ("data", )), ("get_upload_token", ("", ))]
+        with pytest.raises(ValueError):
+            runner.run(calls)
+        results = runner.run(calls, return_exceptions=True)
+        assert results[0] == client.get_token("data")
+        assert isinstance(results[1], ValueError)
+
+
+class PidQiniuClient(aioqiniu.QiniuClient):
+    """可以返回所在进程号的`QiniuClient`，用于观察调用被分配到的子进程"""
+
+    def get_pid(self, key: str = None) -> int:
+        return os.getpid()
+
+    def crash(self) -> None:
+        os._exit(3)
+
+
+def get_fork_runner(monkeypatch, processes: int) -> ShardedRunner:
+    monkeypatch.setattr(sharding, "QiniuClient", PidQiniuClient)
+    return ShardedRunner(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY,
+                         processes=processes,
+                         context=multiprocessing.get_context("fork"))
+
+
+def test_default_shard_key():
+    assert get_default_shard_key("delete_file", ("bucket", "key"), {}) == "key"
+    assert get_default_shard_key(
+        "upload_data", (b"data", "token", "key"), {}) == "key"
+    assert get_default_shard_key(
+        "upload_data", (b"data", "token"), {"key": "key"}) == "key"
+    assert get_default_shard_key("upload_data", (b"data", "token"), {}) is None
+    assert get_default_shard_key(
+        "batch", (("delete", "bucket", "key"), ("stat", "b", "k")), {}) == "key"
+    assert get_default_shard_key("get_token", ("data", ), {}) is None
+    assert get_default_shard_key("no_such_method", (), {}) is None
+
+
+def test_sharded_runner_distribution(monkeypatch):
+    with get_fork_runner(monkeypatch, 3) as runner:
+        pids = runner.run(("get_pid", ()) for i in range(30))
+        assert len(set(pids)) == 3 and os.getpid() not in pids
+
+        keys = [str(i) for i in range(60)]
+        pids = runner.run(("get_pid", (key, )) for key in keys)
+        assert len(set(pids)) == 3
+        assert runner.run(("get_pid", (key, )) for key in keys) == pids
+
+
+def test_sharded_runner_failures(monkeypatch):
+    with get_fork_runner(monkeypatch, 2) as runner:
+        results = runner.run([("create_upload_pipeline", ("bucket", ))],
+                             return_exceptions=True)
+        assert isinstance(results[0], RuntimeError)
+
+        with pytest.raises(RuntimeError):
+            runner.run([("crash", ())] + [("get_pid", ()) for i in range(4)])
+        assert runner.run([("get_pid", ())])[0] != os.getpid()
+
+
+def test_sharded_runner_discards_stale_results():
+    client = aioqiniu.QiniuClient(
+        DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, httpclient=object())
+    with ShardedRunner(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY,
+                       processes=1) as runner:
+        with pytest.raises(Exception):
+            runner.run([("get_token", ("first", )),
+                        ("get_token", (lambda: 0, ))])
+        assert runner.run([("get_token", ("second", ))]) == [
+            client.get_token("second")]
+
+        # 模拟上一次执行在收集结果时被中断，遗留的结果不会被当作本次的结果
+        runner._inqueues[0].put(
+            (-1, 0, pickle.dumps(("get_token", ("stale", ), {}))))
+        assert runner.run([("get_token", ("third", ))]) == [
+            client.get_token("third")]
+
+
+@pytest.mark.asyncio
+async def test_shared_rate_limiter():
+    limiter = SharedRateLimiter(100, burst=1)
+    start = time.monotonic()
+    await asyncio.gather(*[limiter.acquire() for i in range(11)])
+    assert time.monotonic() - start >= 0.09
@@ -0,0 +1,54 @@
+# coding: utf-8
+
+import threading
+
+import pytest
+from aiohttp import web
+
+import aioqiniu
+from aioqiniu.sync import SyncQiniuClient
+
+from .tools import DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, start_test_server
+
+
+async def file_handler(request):
+    key = request.match_info["key"]
+    if key == "missing":
+        raise web.HTTPNotFound()
+    return web.Response(body=key.encode())
+
+
+def test_sync_qiniu_client():
+    client = aioqiniu.QiniuClient(
+        DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, httpclient=object())
+    with SyncQiniuClient(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY) as sync_client:
+        assert sync_client.get_token("data") == client.get_token("data")
+
+        runner, domain = sync_client.run(
+            start_test_server([web.get("/{key}", file_handler)]))
+        try:
+            assert sync_client.download_file("bucket", "a", domain) == b"a"
+
+            results = []
+            threads = [threading.Thread(target=lambda i=i: results.append(
+                sync_client.download_file("bucket", str(i), domain)))
+                for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert sorted(results) == [str(i).encode() for i in range(8)]
+
+            keys = [str(i) for i in range(50)]
+            results = sync_client.map(
+                "download_file", [("bucket", key, domain) for key in keys])
+            assert results == [key.encode() for key in keys]
+            results = sync_client.map(
+                "download_file", [("bucket", "missing", domain)],
+                return_exceptions=True)
+            assert isinstance(results[0], Exception)
+            with pytest.raises(Exception):
+                sync_client.download_file("bucket", "missing", domain)
+        finally:
+            sync_client.run(runner.cleanup())
+    assert sync_client.closed
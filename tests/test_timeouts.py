@@ -0,0 +1,98 @@
+# coding: utf-8
+
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.client import ClientSession, ClientTimeout
+
+import aioqiniu
+from aioqiniu.exceptions import QiniuTimeoutError
+from aioqiniu.timeouts import (DEFAULT_TIMEOUTS, OperationTimeout, deadline,
+                               get_remaining_time)
+
+from .tools import DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY, start_test_server
+
+
+async def slow_handler(request):
+    await asyncio.sleep(float(request.match_info["delay"]))
+    return web.Response(body=b"ok")
+
+
+def start_slow_server():
+    return start_test_server([web.get("/{delay}", slow_handler)])
+
+
+def test_deadline():
+    assert get_remaining_time() is None
+    with deadline(10):
+        assert 9 < get_remaining_time() <= 10
+        with deadline(20):
+            assert get_remaining_time() <= 10
+        with deadline(1):
+            assert get_remaining_time() <= 1
+    assert get_remaining_time() is None
+
+
+@pytest.mark.asyncio
+async def test_operation_timeout():
+    runner, domain = await start_slow_server()
+    timeouts = {"download": OperationTimeout(first_byte=0.2)}
+    try:
+        async with aioqiniu.QiniuClient(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY,
+                                        timeouts=timeouts) as client:
+            assert await client.download_file("bucket", "0", domain) == b"ok"
+            with pytest.raises(QiniuTimeoutError) as excinfo:
+                await client.download_file("bucket", "1", domain)
+            assert excinfo.value.operation == "download"
+            assert isinstance(excinfo.value, asyncio.TimeoutError)
+            assert client.timeout_counts["download"] == 1
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_deadline_propagation():
+    runner, domain = await start_slow_server()
+    try:
+        async with aioqiniu.QiniuClient(DUMMY_ACCESS_KEY,
+                                        DUMMY_SECRET_KEY) as client:
+            start = time.monotonic()
+            with pytest.raises(QiniuTimeoutError):
+                with deadline(0.5):
+                    await client.download_file("bucket", "0.3", domain)
+                    await asyncio.gather(*[
+                        client.download_file("bucket", "0.3", domain)
+                        for i in range(3)])
+            assert time.monotonic() - start < 1
+            assert client.timeout_counts["download"] == 3
+
+            with deadline(0):
+                with pytest.raises(QiniuTimeoutError):
+                    await client.download_file("bucket", "0", domain)
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_session_timeout_is_kept():
+    session = ClientSession(timeout=ClientTimeout(total=1, sock_read=0.5))
+    async with aioqiniu.QiniuClient(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY,
+                                    session) as client:
+        for operation in DEFAULT_TIMEOUTS:
+            timeout = client._get_timeout(operation)
+            assert timeout.total == 1 and timeout.sock_read == 0.5
+
+    timeouts = {"manage": OperationTimeout(total=5)}
+    session = ClientSession(timeout=ClientTimeout(total=1, sock_read=0.5))
+    async with aioqiniu.QiniuClient(DUMMY_ACCESS_KEY, DUMMY_SECRET_KEY,
+                                    session, timeouts) as client:
+        timeout = client._get_timeout("manage")
+        assert timeout.total == 5 and timeout.sock_read == 0.5
+
+    async with aioqiniu.QiniuClient(DUMMY_ACCESS_KEY,
+                                    DUMMY_SECRET_KEY) as client:
+        timeout = client._get_timeout("manage")
+        assert timeout.total == DEFAULT_TIMEOUTS["manage"].total
+        assert timeout.sock_read == DEFAULT_TIMEOUTS["manage"].first_byte
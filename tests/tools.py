@@ -3,6 +3,8 @@
 import os
 
 import pytest
+from aiohttp import web
+
 import aioqiniu
 
 # 七牛AccessKey环境变量名
@@ -12,6 +14,10 @@ QINIU_SECRET_KEY_ENV = "QINIU_SECRET_KEY"
 
 QINIU_ENV_ERROR_MESSAGE = "需要正确设置环境变量'QINIU_ACCESS_KEY'和'QINIU_SECRET_KEY'"
 
+# 不访问七牛的离线测试使用的AccessKey和SecretKey
+DUMMY_ACCESS_KEY = "A" * 40
+DUMMY_SECRET_KEY = "S" * 40
+
 
 def qiniu_environ_is_set_correctly() -> bool:
     """判断七牛环境变量是否被正确设置"""
@@ -46,3 +52,21 @@ async def get_qiniu_client() -> aioqiniu.QiniuClient:
     assert qiniu_environ_is_set_correctly(), QINIU_ENV_ERROR_MESSAGE
 
     return aioqiniu.QiniuClient(*get_qiniu_environ())
+
+
+async def start_test_server(routes: list, **kwargs) -> tuple:
+    """在本地随机端口启动一个用于测试的aiohttp服务器
+
+    调用方负责在测试结束后(包括断言失败时)调用`runner.cleanup()`关闭服务器。
+
+    :param routes: 路由列表，元素为`aiohttp.web.get`等函数返回的路由定义
+    :param **kwargs: 传给`aiohttp.web.Application`的参数
+
+    :return: 返回一个二元组，(web.AppRunner, 服务器地址"127.0.0.1:端口")
+    """
+    app = web.Application(**kwargs)
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner, "127.0.0.1:{}".format(runner.addresses[0][1])